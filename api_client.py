@@ -1,22 +1,36 @@
-# api_client.py - minimal HTTP client wrapper around requests
-import requests
+# api_client.py - minimal HTTP client wrapper around httpx (HTTP/2, pooled)
+import httpx
+
+_LIMITS = httpx.Limits(max_keepalive_connections=32, max_connections=64)
+
 
 class APIClient:
     def __init__(self, base_url, timeout=30):
         self.base_url = base_url.rstrip('/')
-        self.session = requests.Session()
         self.timeout = timeout
-
-    def _url(self, endpoint):
-        return f"{self.base_url}/{endpoint.lstrip('/')}"
+        # http2=True lets concurrent requests multiplex over one connection;
+        # any runner built on this wrapper gets that for free
+        self.session = httpx.Client(
+            http2=True,
+            base_url=self.base_url,
+            timeout=timeout,
+            limits=_LIMITS,
+        )
 
     def post(self, endpoint, json_payload=None, data=None, headers=None):
-        url = self._url(endpoint)
         if json_payload is not None:
-            return self.session.post(url, json=json_payload, headers=headers, timeout=self.timeout)
+            return self.session.post(endpoint, json=json_payload, headers=headers)
         else:
-            return self.session.post(url, data=data, headers=headers, timeout=self.timeout)
+            return self.session.post(endpoint, data=data, headers=headers)
 
     def get(self, endpoint, params=None, headers=None):
-        url = self._url(endpoint)
-        return self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+        return self.session.get(endpoint, params=params, headers=headers)
+
+    def aclient(self):
+        """Build an AsyncClient with the same base_url/timeout/limits for async callers."""
+        return httpx.AsyncClient(
+            http2=True,
+            base_url=self.base_url,
+            timeout=self.timeout,
+            limits=_LIMITS,
+        )
@@ -13,14 +13,26 @@ import time
 import csv
 from datetime import datetime
 from pathlib import Path
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 BASE_URL = "http://35.226.27.129:8000"
 ENDPOINT = "/api/health"
 
 url = f"{BASE_URL.rstrip('/')}{ENDPOINT}"
-headers = {
+
+# ---------- SESSION (pooled + retrying) ----------
+session = requests.Session()
+adapter = HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=10,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[502, 503, 504]),
+)
+session.mount("http://", adapter)
+session.mount("https://", adapter)
+session.headers.update({
     "accept": "application/json",
-}
+})
 
 # ---------- REPORT PATH ----------
 REPORTS_DIR = Path("reports")
@@ -29,7 +41,7 @@ TIMESTAMP = time.strftime("%Y%m%d-%H%M%S")
 OUT_CSV = REPORTS_DIR / f"health_{TIMESTAMP}.csv"
 
 try:
-    resp = requests.get(url, headers=headers, timeout=30)
+    resp = session.get(url, timeout=30)
     print("Status:", resp.status_code)
 
     try:
@@ -15,6 +15,8 @@ import csv
 import time
 from datetime import datetime
 from pathlib import Path
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 BASE_URL = os.environ.get("BASE_URL", "http://35.226.27.129:8000")
 ENDPOINT = "/api/v1/agent/inventory"
@@ -26,10 +28,19 @@ JWT = (
 
 url = f"{BASE_URL.rstrip('/')}{ENDPOINT}"
 
-headers = {
+# ---------- SESSION (pooled + retrying) ----------
+session = requests.Session()
+adapter = HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=10,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[502, 503, 504]),
+)
+session.mount("http://", adapter)
+session.mount("https://", adapter)
+session.headers.update({
     "accept": "application/json",
     "Authorization": f"Bearer {JWT}",
-}
+})
 
 # ---------- REPORT PATH ----------
 REPORTS_DIR = Path("reports")
@@ -39,7 +50,7 @@ TIMESTAMP = time.strftime("%Y%m%d-%H%M%S")
 OUT_CSV = REPORTS_DIR / f"inventory_results_{TIMESTAMP}.csv"
 
 try:
-    resp = requests.get(url, headers=headers, timeout=60)
+    resp = session.get(url, timeout=60)
     print("Status:", resp.status_code)
 
     # Try parse as JSON
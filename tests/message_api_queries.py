@@ -7,16 +7,19 @@ Resilient runner for agent message API queries (increased timeouts & retries).
 - MAX_TIMEOUT default is now 3600s (1 hour)
 - All values can still be overridden via env vars TIMEOUT, RETRIES, MAX_TIMEOUT
 """
+import asyncio
 import csv
-import json
+import functools
 import os
 import time
-import logging
+import httpx
+import orjson
 from datetime import datetime
 from pathlib import Path
-from requests import Request, exceptions as req_exceptions
-from api_client import APIClient
+from types import MappingProxyType
 from utils.payload_loader import get_logger
+from utils.report_writer import BackgroundWriter
+from utils.sse_parse import parse_sse_json as _parse_sse_json
 
 logger = get_logger("agent-runner")
 
@@ -45,7 +48,7 @@ CSV_PATH = HERE / "data" / "testcases.csv"
 REPORTS_DIR = HERE / "reports"
 REPORTS_DIR.mkdir(parents=True, exist_ok=True)
 TIMESTAMP = time.strftime("%Y%m%d-%H%M%S")
-OUT_JSON = REPORTS_DIR / f"agent_query_results_{TIMESTAMP}.json"
+OUT_JSONL = REPORTS_DIR / f"agent_query_results_{TIMESTAMP}.jsonl"
 OUT_CSV = REPORTS_DIR / f"agent_query_results_{TIMESTAMP}.csv"
 
 # Read queries from CSV
@@ -65,164 +68,242 @@ with open(CSV_PATH, newline="", encoding="utf-8") as fh:
 if not queries:
     logger.warning("No queries found in CSV: %s", CSV_PATH)
 
-# API client (reuse your client wrapper - expects client.session)
-client = APIClient(BASE_URL, timeout=BASE_TIMEOUT)
+# HTTP/2 async client: concurrent queries multiplex over one connection instead
+# of serializing (head-of-line blocked) on a single HTTP/1.1 keep-alive socket
+CONCURRENCY = int(os.environ.get("CONCURRENCY", "8"))
 
+# Headers never change mid-run: normalize the Authorization value once at import
+# and freeze the dict; the client carries it so no per-call merge happens
+_AUTH = JWT if JWT[:7].lower() == "bearer " else f"Bearer {JWT}"
+HEADERS = MappingProxyType({
+    "accept": "application/json",
+    "Content-Type": "application/json",
+    "User-Agent": "python-requests/2.32.5",
+    "Authorization": _AUTH,
+})
 
-def prepare_and_send(query_text: str, retries: int = RETRIES) -> tuple:
+URL = f"{BASE_URL.rstrip('/')}/{ENDPOINT.lstrip('/')}"
+
+client = httpx.AsyncClient(
+    http2=True,
+    headers=HEADERS,
+    timeout=httpx.Timeout(BASE_TIMEOUT),
+    limits=httpx.Limits(max_connections=16),
+)
+
+
+async def prepare_and_send(query_text: str, retries: int = RETRIES) -> tuple:
     """
-    Send the POST request, with retries/backoff on ReadTimeout / ConnectionError.
+    Send the POST request, with retries/backoff on ReadTimeout / ConnectError.
 
-    Returns: (status, body)
+    Returns: (status, body, body_raw, resp_text)
       - status will be int status_code on HTTP response
       - or a sentinel string like 'TIMEOUT' or 'REQUEST_ERROR' on failure
       - body will be parsed JSON or text or error string
+      - body_raw is the decoded raw response text (None on failure)
+      - resp_text is the tool_runner output extracted from an SSE stream
+        ('' for non-stream responses; flatten derives it from body instead)
     """
-    headers = {
-        "accept": "application/json",
-        "Content-Type": "application/json",
-        "User-Agent": "python-requests/2.32.5",
-    }
-    if JWT:
-        headers["Authorization"] = JWT if JWT.lower().startswith("bearer ") else f"Bearer {JWT}"
-
-    payload = {
+    # serialize once with orjson and send the bytes; Content-Type is already on
+    # the client headers, so retries resend the same buffer with no re-encoding
+    body_bytes = orjson.dumps({
         "thread_id": "1",
         "session_id": "1",
         "content": [{"type": "text", "text": query_text}],
-    }
-
-    req = Request("POST", f"{BASE_URL.rstrip('/')}/{ENDPOINT.lstrip('/')}", headers=headers, json=payload)
-    prepared = client.session.prepare_request(req)
-
-    # Log prepared request (with Authorization redacted for logs)
-    safe_headers = dict(prepared.headers)
-    if "Authorization" in safe_headers:
-        safe_headers["Authorization"] = safe_headers["Authorization"].split(" ", 1)[0] + " [REDACTED]"
-    logger.info("=== PREPARED REQUEST ===")
-    logger.info("%s %s", prepared.method, prepared.url)
-    for k, v in safe_headers.items():
-        logger.info("REQ-HEADER %s: %s", k, v)
-    body_preview = prepared.body
-    try:
-        if isinstance(body_preview, bytes):
-            body_preview = body_preview.decode("utf-8", errors="ignore")
-    except Exception:
-        pass
-    logger.info("REQ-BODY: %s", body_preview)
-    logger.info("========================")
+    })
 
     attempt = 0
     # start with base timeout, and increase on retries
-    attempt_timeout = float(client.timeout or BASE_TIMEOUT) if client.timeout else BASE_TIMEOUT
+    attempt_timeout = BASE_TIMEOUT
 
     while True:
         attempt += 1
         try:
             t0 = time.time()
-            resp = client.session.send(prepared, timeout=attempt_timeout)
+            # split connect vs read timeouts: stuck connects fail fast while the
+            # stream itself may legitimately take minutes
+            timeout = httpx.Timeout(attempt_timeout, connect=10.0)
+            async with client.stream("POST", URL, content=body_bytes, timeout=timeout) as resp:
+                ctype = (resp.headers.get("Content-Type") or "").lower()
+                if "text/event-stream" in ctype:
+                    # consume SSE incrementally: keep the latest tool_runner
+                    # output plus a 2-slot tail for the fallback, so peak
+                    # memory is O(1) regardless of stream length while the
+                    # report still records the assistant's actual response
+                    events = 0
+                    last_data = ""
+                    last_tool_output = None
+                    prev_obj = None
+                    last_obj = None
+                    # streams re-emit identical lines; hashing is far cheaper
+                    # than re-parsing, so repeats are skipped outright
+                    seen_hashes = set()
+                    async for line in resp.aiter_lines():
+                        s = line.strip()
+                        if not s.startswith("data:"):
+                            continue
+                        events += 1
+                        last_data = s[5:].lstrip()
+                        h = hash(last_data)
+                        if h in seen_hashes:
+                            continue
+                        seen_hashes.add(h)
+                        obj = _parse_sse_json(last_data)
+                        if obj is None or not isinstance(obj, dict):
+                            continue
+                        prev_obj, last_obj = last_obj, obj
+                        if obj.get("type") == "step_update":
+                            d = obj.get("data") or {}
+                            if d.get("step") == "tool_runner" and "output" in d:
+                                out = d["output"]
+                                last_tool_output = out if isinstance(out, str) else orjson.dumps(out).decode()
+                    elapsed = time.time() - t0
+                    logger.info("Attempt %d -> status %s (%d SSE events, elapsed %.3fs, timeout %.1fs)",
+                                attempt, resp.status_code, events, elapsed, attempt_timeout)
+                    if last_tool_output is None and prev_obj is not None:
+                        # Fallback: second-last event's 'output'
+                        d = prev_obj.get("data") or {}
+                        out = d.get("output")
+                        if out is not None:
+                            last_tool_output = out if isinstance(out, str) else orjson.dumps(out).decode()
+                    body = last_obj if last_obj is not None else last_data
+                    return resp.status_code, body, last_data, (last_tool_output or "")
+
+                raw = await resp.aread()
+
             elapsed = time.time() - t0
             logger.info("Attempt %d -> status %s (elapsed %.3fs, timeout %.1fs)", attempt, resp.status_code, elapsed, attempt_timeout)
-            # try parse json, fallback to text
+            # parse the raw bytes with orjson and keep them: the CSV column can
+            # reuse the already-serialized form instead of re-dumping the dict
+            body_raw = raw.decode("utf-8", "replace")
             try:
-                body = resp.json()
+                body = orjson.loads(raw)
             except Exception:
-                body = resp.text
-            return resp.status_code, body
+                body = body_raw
+            return resp.status_code, body, body_raw, ""
 
-        except req_exceptions.ReadTimeout as e:
+        except httpx.ReadTimeout as e:
             logger.warning("Attempt %d -> ReadTimeout after %.1fs: %s", attempt, attempt_timeout, str(e))
             if attempt > retries:
                 logger.error("Exceeded retries (%d). Returning TIMEOUT.", retries)
-                return "TIMEOUT", f"ReadTimeout after {attempt_timeout}s: {str(e)}"
+                return "TIMEOUT", f"ReadTimeout after {attempt_timeout}s: {str(e)}", None, ""
             # exponential backoff & increase timeout (but cap it)
             backoff = min(0.5 * (2 ** (attempt - 1)), 8.0)
             attempt_timeout = min(attempt_timeout * 1.75, MAX_TIMEOUT)
-            logger.info("Sleeping %.2fs before retrying (next timeout %.1fs)...", backoff, attempt_timeout)
-            time.sleep(backoff)
+            logger.debug("Sleeping %.2fs before retrying (next timeout %.1fs)...", backoff, attempt_timeout)
+            await asyncio.sleep(backoff)
             continue
 
-        except req_exceptions.ConnectionError as e:
-            logger.warning("Attempt %d -> ConnectionError: %s", attempt, str(e))
+        except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+            logger.warning("Attempt %d -> ConnectError: %s", attempt, str(e))
             if attempt > retries:
                 logger.error("Exceeded retries (%d) on connection errors. Returning REQUEST_ERROR.", retries)
-                return "REQUEST_ERROR", str(e)
+                return "REQUEST_ERROR", str(e), None, ""
             backoff = min(0.5 * (2 ** (attempt - 1)), 8.0)
-            logger.info("Sleeping %.2fs before retrying connection...", backoff)
-            time.sleep(backoff)
+            logger.debug("Sleeping %.2fs before retrying connection...", backoff)
+            await asyncio.sleep(backoff)
             continue
 
         except Exception as e:
             logger.exception("Unexpected exception while sending request: %s", str(e))
-            return "REQUEST_ERROR", str(e)
+            return "REQUEST_ERROR", str(e), None, ""
+
+
+@functools.lru_cache(maxsize=1024)
+def _fmt(sec: int) -> tuple:
+    """Format one integer second as (date, local timestamp); rows landing in the
+    same second reuse the cached strings instead of re-running strftime."""
+    lt = time.localtime(sec)
+    return time.strftime("%Y-%m-%d", lt), time.strftime("%Y-%m-%d %H:%M:%S", lt)
+
+
+def flatten(entry: dict) -> dict:
+    """Flatten one result entry into a CSV summary row."""
+    try:
+        date_val, timestamp_human = _fmt(int(float(entry.get("timestamp", time.time()))))
+    except Exception:
+        date_val, timestamp_human = _fmt(int(time.time()))
+
+    body = entry.get("body", "")
+    # SSE responses carry the extracted tool_runner output; JSON bodies
+    # fall through to the content/message derivation below
+    resp_text = entry.get("resp_text", "")
+    if not resp_text and isinstance(body, dict):
+        content = body.get("content")
+        if isinstance(content, dict):
+            resp_text = content.get("text", "")
+        elif isinstance(content, list) and len(content) > 0 and isinstance(content[0], dict):
+            resp_text = content[0].get("text", "") or content[0].get("message", "") or ""
+        if not resp_text:
+            resp_text = body.get("message", "") or body.get("error", "")
 
+    body_text = entry.get("body_raw")
+    if body_text is None:
+        body_text = body
+        if not isinstance(body_text, str):
+            try:
+                body_text = orjson.dumps(body_text).decode()
+            except Exception:
+                body_text = str(body_text)
 
-# run and collect
-results = []
-for row in queries:
+    return {
+        "id": entry.get("id", ""),
+        "query": entry.get("query", ""),
+        "status": entry.get("status", ""),
+        "date": date_val,
+        "timestamp": timestamp_human,
+        "resp_text": resp_text,
+        "body": body_text
+    }
+
+
+async def run_one(sem, row):
+    """Run one query under the concurrency semaphore and return its entry."""
     qid = row["id"]
     qtext = row["query"]
-    logger.info("Running query id=%s: %s", qid, qtext)
-    status, body = prepare_and_send(qtext, retries=RETRIES)
+    async with sem:
+        logger.info("Running query id=%s: %s", qid, qtext[:120])
+        status, body, body_raw, resp_text = await prepare_and_send(qtext, retries=RETRIES)
 
     now_iso = datetime.utcnow().isoformat() + "Z"
 
-    entry = {
+    return {
         "id": qid,
         "query": qtext,
         "status": status,
         "body": body,
+        "body_raw": body_raw,
+        "resp_text": resp_text,
         "timestamp": time.time(),
         "date": now_iso,
     }
-    results.append(entry)
-    time.sleep(0.1)
-
-# write JSON
-OUT_JSON.write_text(json.dumps(results, indent=2, ensure_ascii=False))
-logger.info("Wrote JSON report: %s", OUT_JSON)
-
-# write CSV summary
-with open(OUT_CSV, "w", newline="", encoding="utf-8") as csvfh:
-    fieldnames = ["id", "query", "status", "date", "timestamp", "resp_text", "body"]
-    writer = csv.DictWriter(csvfh, fieldnames=fieldnames)
-    writer.writeheader()
-    for r in results:
-        try:
-            ts = float(r.get("timestamp", time.time()))
-            date_val = datetime.fromtimestamp(ts).strftime("%Y-%m-%d")
-            timestamp_human = datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S")
-        except Exception:
-            date_val = datetime.now().strftime("%Y-%m-%d")
-            timestamp_human = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-        body = r.get("body", "")
-        resp_text = ""
-        if isinstance(body, dict):
-            content = body.get("content")
-            if isinstance(content, dict):
-                resp_text = content.get("text", "")
-            elif isinstance(content, list) and len(content) > 0 and isinstance(content[0], dict):
-                resp_text = content[0].get("text", "") or content[0].get("message", "") or ""
-            if not resp_text:
-                resp_text = body.get("message", "") or body.get("error", "")
 
-        body_text = body
-        if not isinstance(body_text, str):
-            try:
-                body_text = json.dumps(body_text, ensure_ascii=False)
-            except Exception:
-                body_text = str(body_text)
 
-        writer.writerow({
-            "id": r.get("id", ""),
-            "query": r.get("query", ""),
-            "status": r.get("status", ""),
-            "date": date_val,
-            "timestamp": timestamp_human,
-            "resp_text": resp_text,
-            "body": body_text
-        })
-
-logger.info("Wrote CSV report: %s", OUT_CSV)
-logger.info("Done. %d queries executed.", len(results))
+async def main():
+    """Run all queries concurrently, streaming each row to the reports as it returns."""
+    sem = asyncio.Semaphore(CONCURRENCY)
+    count = 0
+    jsonl_w = BackgroundWriter(OUT_JSONL)
+    try:
+        with open(OUT_CSV, "w", newline="", encoding="utf-8") as csvfh:
+            fieldnames = ["id", "query", "status", "date", "timestamp", "resp_text", "body"]
+            writer = csv.DictWriter(csvfh, fieldnames=fieldnames)
+            writer.writeheader()
+
+            tasks = [asyncio.ensure_future(run_one(sem, row)) for row in queries]
+            for fut in asyncio.as_completed(tasks):
+                entry = await fut
+                writer.writerow(flatten(entry))
+                jsonl_w.submit(orjson.dumps(entry) + b"\n")
+                csvfh.flush()
+                count += 1
+    finally:
+        jsonl_w.close()
+
+    await client.aclose()
+    logger.info("Wrote JSONL report: %s", OUT_JSONL)
+    logger.info("Wrote CSV report: %s", OUT_CSV)
+    logger.info("Done. %d queries executed.", count)
+
+
+asyncio.run(main())
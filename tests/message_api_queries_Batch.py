@@ -11,21 +11,35 @@ This version:
   tool_runner 'output' into resp_text.
 """
 
+import asyncio
 import csv
-import json
+import itertools
+import logging
 import os
 import time
-import base64
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import List, Dict, Tuple, Any
-from requests import Request, exceptions as req_exceptions
+from typing import List, Dict, Iterable, Iterator, Tuple, Any
+import httpx
+import orjson
 
-from api_client import APIClient
 from utils.payload_loader import get_logger
+from utils.sse_parse import (
+    parse_sse_json as _parse_sse_json,
+    extract_tool_runner_output_from_stream as _extract_tool_runner_output_from_stream,
+)
 
 logger = get_logger("agent-runner")
 
+# orjson shims: loads is ~2-3x stdlib, dumps ~5-10x on nested dicts; _dumps
+# keeps the str-returning json.dumps call shape the rest of the file expects.
+def _loads(s: Any) -> Any:
+    return orjson.loads(s)
+
+def _dumps(o: Any) -> str:
+    return orjson.dumps(o, option=orjson.OPT_NON_STR_KEYS, default=str).decode()
+
 # ------------ Config (env-overridable) ------------
 BASE_URL = os.environ.get("BASE_URL", "http://35.226.27.129:8000")
 ENDPOINT = os.environ.get("ENDPOINT", "/api/v1/agent/stream")
@@ -49,10 +63,27 @@ BASE_TIMEOUT = float(os.environ.get("TIMEOUT", "600"))     # seconds
 RETRIES = int(os.environ.get("RETRIES", "3"))
 MAX_TIMEOUT = float(os.environ.get("MAX_TIMEOUT", "1800")) # seconds
 
+# Retry schedule, precomputed once: backoff seconds, the growing read timeout,
+# and the httpx.Timeout object for each attempt. The retry loop runs
+# N_queries x (1 + retries) times, so it just indexes these tuples.
+_BACKOFF = tuple(min(0.5 * (2 ** i), 8.0) for i in range(RETRIES + 2))
+_READ_TIMEOUTS = tuple(min(BASE_TIMEOUT * (1.75 ** i), MAX_TIMEOUT) for i in range(RETRIES + 2))
+_ATTEMPT_TIMEOUTS = tuple(
+    httpx.Timeout(connect=10.0, read=rt, write=30.0, pool=None) for rt in _READ_TIMEOUTS
+)
+
+# Cap on the raw body copied into a CSV cell; unbounded cells make every later
+# parse of the report (including combine_all_csv_reports) pay for them.
+MAX_BODY_BYTES = int(os.environ.get("MAX_BODY_BYTES", "65536"))
+
 # Batching controls
 BATCH_SIZE = int(os.environ.get("BATCH_SIZE", "10"))
 BATCH_DELAY = float(os.environ.get("BATCH_DELAY", "15"))
 START_INDEX = int(os.environ.get("START_INDEX", "0"))
+# BATCH_API=1 sends each (thread, session, device) group of a batch as ONE
+# multi-content request, amortizing TLS/auth/agent bootstrap per call; leave
+# off unless the endpoint accepts a content list with per-item ref_id.
+BATCH_API = os.environ.get("BATCH_API", "0") == "1"
 
 # Paths & reporting
 HERE = Path(__file__).parent.parent
@@ -61,15 +92,17 @@ REPORTS_DIR = HERE / "reports"
 REPORTS_DIR.mkdir(parents=True, exist_ok=True)
 
 TIMESTAMP = time.strftime("%Y%m%d-%H%M%S")
-OUT_JSON = REPORTS_DIR / f"agent_query_results_{TIMESTAMP}.json"
-OUT_CSV  = REPORTS_DIR / f"agent_query_results_{TIMESTAMP}.csv"
+OUT_JSON  = REPORTS_DIR / f"agent_query_results_{TIMESTAMP}.json"
+OUT_JSONL = REPORTS_DIR / f"agent_query_results_{TIMESTAMP}.jsonl"
+OUT_CSV   = REPORTS_DIR / f"agent_query_results_{TIMESTAMP}.csv"
 
 # ---------- helper functions ----------
-def load_queries(csv_path: Path) -> List[Dict[str, str]]:
+def load_queries(csv_path: Path) -> Iterator[Dict[str, str]]:
+    """Yield query rows one at a time so memory stays flat however large the
+    testcases file grows."""
     if not csv_path.exists():
         logger.error("CSV file not found: %s", csv_path)
         raise SystemExit(1)
-    qs: List[Dict[str, str]] = []
     with csv_path.open(newline="", encoding="utf-8") as fh:
         rdr = csv.DictReader(fh)
         for idx, row in enumerate(rdr):
@@ -81,55 +114,87 @@ def load_queries(csv_path: Path) -> List[Dict[str, str]]:
             th_id = (row.get("thread_id") or "").strip()
             ss_id = (row.get("session_id") or "").strip()
             dv_id = (row.get("device_id") or "").strip()
-            qs.append({
+            yield {
                 "id": qid,
                 "query": q_text,
                 "thread_id": th_id,
                 "session_id": ss_id,
                 "device_id": dv_id,
-            })
-    return qs
+            }
 
-def chunked(iterable: List[Any], n: int):
-    for i in range(0, len(iterable), n):
-        yield iterable[i:i+n]
+def chunked(iterable: Iterable[Any], n: int) -> Iterator[List[Any]]:
+    it = iter(iterable)
+    while chunk := list(itertools.islice(it, n)):
+        yield chunk
 
 def write_json(results: List[Dict[str, Any]], path: Path):
     try:
-        path.write_text(json.dumps(results, indent=2, ensure_ascii=False), encoding="utf-8")
+        path.write_bytes(orjson.dumps(results, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS, default=str))
         logger.info("Wrote JSON: %s (entries=%d)", path, len(results))
     except Exception:
         logger.exception("Failed writing JSON to %s", path)
 
-def write_csv(results: List[Dict[str, Any]], path: Path):
-    fieldnames = ["id", "query", "status", "date", "timestamp", "resp_text", "body"]
+CSV_FIELDNAMES = ["id", "query", "status", "date", "timestamp", "resp_text", "body"]
+
+def csv_row(r: Dict[str, Any]) -> Tuple[Any, ...]:
+    """Shape one result entry into a positional CSV row (CSV_FIELDNAMES order).
+
+    The human-readable date/timestamp are formatted once when the entry is
+    built (strftime is expensive C locale work), so this is pure dict lookups,
+    and csv.writer skips DictWriter's per-row field reordering.
+    """
+    return (
+        r.get("id", ""),
+        r.get("query", ""),
+        r.get("status", ""),
+        r.get("date_human", ""),
+        r.get("timestamp_human", ""),
+        r.get("resp_text", ""),
+        r.get("body", "")[:MAX_BODY_BYTES],
+    )
+
+# ---------- combine CSV reports ----------
+_COMBINE_COLUMNS = ("id", "test_id", "query", "payload", "status", "date",
+                    "timestamp", "resp_text", "resp_fields", "body")
+
+def _read_report_csv(f: Path) -> Dict[Tuple, List[str]]:
+    """Read one report CSV into {(id, query): positional output row}."""
+    out: Dict[Tuple, List[str]] = {}
+    with f.open(newline="", encoding="utf-8", buffering=1 << 20) as fh:
+        reader = csv.reader(fh)
+        try:
+            header = next(reader)
+        except StopIteration:
+            return out
+        idx = {name: header.index(name) for name in _COMBINE_COLUMNS if name in header}
+        for row in reader:
+            def cell(name: str, _row=row) -> str:
+                i = idx.get(name)
+                return _row[i] if i is not None and i < len(_row) else ""
+
+            row_id = (cell("id") or cell("test_id")).strip()
+            row_query = (cell("query") or cell("payload")).strip()
+            if not row_query:
+                row_query = cell("resp_text").strip()
+            key = (row_id, row_query) if (row_id or row_query) else (None, "\x1f".join(row))
+            out[key] = [
+                cell("id") or cell("test_id"),
+                cell("query") or cell("payload"),
+                cell("status"),
+                cell("date"),
+                cell("timestamp"),
+                cell("resp_text") or cell("resp_fields"),
+                cell("body"),
+            ]
+    return out
+
+def _safe_read_report_csv(f: Path) -> Dict[Tuple, List[str]] | None:
     try:
-        with path.open("w", newline="", encoding="utf-8") as csvfh:
-            writer = csv.DictWriter(csvfh, fieldnames=fieldnames)
-            writer.writeheader()
-            for r in results:
-                try:
-                    ts = float(r.get("timestamp", time.time()))
-                    date_val = datetime.fromtimestamp(ts).strftime("%Y-%m-%d")
-                    timestamp_human = datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S")
-                except Exception:
-                    date_val = datetime.now().strftime("%Y-%m-%d")
-                    timestamp_human = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-                writer.writerow({
-                    "id": r.get("id", ""),
-                    "query": r.get("query", ""),
-                    "status": r.get("status", ""),
-                    "date": date_val,
-                    "timestamp": timestamp_human,
-                    "resp_text": r.get("resp_text", ""),
-                    "body": r.get("body", ""),
-                })
-        logger.info("Wrote CSV: %s (entries=%d)", path, len(results))
+        return _read_report_csv(f)
     except Exception:
-        logger.exception("Failed writing CSV to %s", path)
+        logger.exception("Failed reading CSV file %s, skipping.", f)
+        return None
 
-# ---------- combine CSV reports ----------
 def combine_all_csv_reports(reports_dir: Path, out_filename: str = None) -> Path:
     pattern = "agent_query_results_*.csv"
     files = sorted(reports_dir.glob(pattern), key=lambda p: p.stat().st_mtime)
@@ -138,53 +203,59 @@ def combine_all_csv_reports(reports_dir: Path, out_filename: str = None) -> Path
         return Path()
 
     logger.info("Found %d CSV report(s) to combine.", len(files))
-    seen = {}
-    combined_rows: List[Dict[str, str]] = []
-
-    for f in files:
-        try:
-            with f.open(newline="", encoding="utf-8") as fh:
-                reader = csv.DictReader(fh)
-                for row in reader:
-                    row_id = (row.get("id") or row.get("test_id") or "").strip()
-                    row_query = (row.get("query") or row.get("payload") or "").strip()
-                    if not row_query:
-                        row_query = (row.get("resp_text") or "").strip()
-                    key = (row_id, row_query) if (row_id or row_query) else (None, json.dumps(row, sort_keys=True))
-                    seen[key] = row
-        except Exception:
-            logger.exception("Failed reading CSV file %s, skipping.", f)
-            continue
-
-    for _, row in seen.items():
-        out = {
-            "id": row.get("id", row.get("test_id", "")),
-            "query": row.get("query", "") or row.get("payload", "") or "",
-            "status": row.get("status", ""),
-            "date": row.get("date", ""),
-            "timestamp": row.get("timestamp", ""),
-            "resp_text": row.get("resp_text", "") or row.get("resp_fields", "") or "",
-            "body": row.get("body", "") or ""
-        }
-        combined_rows.append(out)
+    # Reads are pure I/O + CSV parsing, so the files parse in parallel; the
+    # merge happens on the main thread in mtime order so newer files still
+    # win the (id, query) dedupe.
+    seen: Dict[Tuple, List[str]] = {}
+    with ThreadPoolExecutor(max_workers=min(8, len(files))) as ex:
+        for result in ex.map(_safe_read_report_csv, files):
+            if result is not None:
+                seen.update(result)
 
     out_fn = out_filename or f"combined_agent_query_results_{time.strftime('%Y%m%d-%H%M%S')}.csv"
     out_path = reports_dir / out_fn
     try:
-        with out_path.open("w", newline="", encoding="utf-8") as csvfh:
-            fieldnames = ["id", "query", "status", "date", "timestamp", "resp_text", "body"]
-            writer = csv.DictWriter(csvfh, fieldnames=fieldnames)
-            writer.writeheader()
-            for r in combined_rows:
-                writer.writerow(r)
-        logger.info("Wrote combined CSV: %s (rows=%d)", out_path, len(combined_rows))
+        with out_path.open("w", newline="", encoding="utf-8", buffering=1 << 20) as csvfh:
+            writer = csv.writer(csvfh)
+            writer.writerow(CSV_FIELDNAMES)
+            writer.writerows(seen.values())
+        logger.info("Wrote combined CSV: %s (rows=%d)", out_path, len(seen))
     except Exception:
         logger.exception("Failed to write combined CSV to %s", out_path)
         raise
     return out_path
 
-# ---------- HTTP send logic (resilient) ----------
-client = APIClient(BASE_URL, timeout=BASE_TIMEOUT)
+# Headers never change for the life of the run: built exactly once here (the
+# ~600-byte JWT string included) and handed to the client, so no per-call or
+# per-retry dict is ever assembled.
+_BASE_HEADERS = {
+    "accept": "application/json",
+    "Content-Type": "application/json",
+    "User-Agent": "python-requests/2.32.5",
+    "Authorization": JWT,  # <-- hard-coded token
+}
+
+# ---------- HTTP send logic (resilient, async) ----------
+# Every query in a batch is pure I/O wait on the agent API, so they run
+# concurrently on one HTTP/2-multiplexed AsyncClient instead of one at a time.
+# Fixed headers live on the client: no per-call dict build or header merge.
+# Match Swagger exactly by default.
+client = httpx.AsyncClient(
+    base_url=BASE_URL,
+    http2=True,
+    # split timeouts: stuck connects fail in 10s while reads may legitimately
+    # take minutes on long agent queries; pool=None never times out waiting
+    # for a connection since the semaphore already caps in-flight requests
+    timeout=httpx.Timeout(connect=10.0, read=BASE_TIMEOUT, write=30.0, pool=None),
+    # keepalive_expiry must outlive BATCH_DELAY, or every batch after the first
+    # pays the TCP/TLS handshake again on connections the pool just dropped
+    limits=httpx.Limits(
+        max_connections=BATCH_SIZE * 2,
+        max_keepalive_connections=BATCH_SIZE * 2,
+        keepalive_expiry=BATCH_DELAY + 30.0,
+    ),
+    headers=_BASE_HEADERS,
+)
 
 def _normalize_ids(row: Dict[str, str]) -> Tuple[str, str, str]:
     th = row.get("thread_id") or THREAD_ID
@@ -192,79 +263,14 @@ def _normalize_ids(row: Dict[str, str]) -> Tuple[str, str, str]:
     dv = row.get("device_id") or DEVICE_ID
     return str(th), str(ss), str(dv)
 
-def _extract_tool_runner_output_from_stream(body: Any) -> str:
-    # If server already gave us dict (non-stream error), handle it
-    if isinstance(body, dict):
-        if body.get("type") == "step_update":
-            data = body.get("data") or {}
-            if data.get("step") == "tool_runner" and "output" in data:
-                return str(data["output"])
-        # if it has direct "output"
-        if "output" in body:
-            out = body.get("output")
-            return out if isinstance(out, str) else json.dumps(out, ensure_ascii=False)
-        return ""
-
-    if not isinstance(body, str):
-        try:
-            return json.dumps(body, ensure_ascii=False)
-        except Exception:
-            return str(body)
-
-    lines = [ln.strip() for ln in body.splitlines() if ln.strip().startswith("data:")]
-    if not lines:
-        return ""  # not an SSE-like body
-
-    parsed = []
-    for ln in lines:
-        json_part = ln[len("data:"):].strip()
-        if json_part.startswith('"') and json_part.endswith('"'):
-            try:
-                json_part = json.loads(json_part)  # unescape once
-            except Exception:
-                pass
-        try:
-            obj = json.loads(json_part)
-            parsed.append(obj)
-        except Exception:
-            try:
-                fixed = json_part.replace('""', '"')
-                obj = json.loads(fixed)
-                parsed.append(obj)
-            except Exception:
-                continue
-
-    # Prefer the most recent tool_runner step_update before completed
-    for obj in reversed(parsed[:-1] if parsed else []):
-        if obj.get("type") == "step_update":
-            d = obj.get("data") or {}
-            if d.get("step") == "tool_runner" and "output" in d:
-                out = d.get("output")
-                return out if isinstance(out, str) else json.dumps(out, ensure_ascii=False)
-
-    # Fallback: second-last event's 'output'
-    if len(parsed) >= 2:
-        obj = parsed[-2]
-        d = obj.get("data") or {}
-        out = d.get("output")
-        if out is not None:
-            return out if isinstance(out, str) else json.dumps(out, ensure_ascii=False)
-
-    return ""
-
-def prepare_and_send(query_text: str, row_ids: Dict[str, str], retries: int = RETRIES) -> Tuple[Any, Any]:
+async def prepare_and_send(query_text: str, row_ids: Dict[str, str], retries: int = RETRIES) -> Tuple[Any, Any, Any]:
     """
     Send a single query payload with retries/backoff.
-    Returns (status, body) where body is str or dict.
+    Returns (status, body, parsed_text):
+      - body is str or dict (for SSE responses, the final data payload only)
+      - parsed_text is the extracted tool_runner output for SSE responses,
+        or None when the caller must run the dict-body fallback extraction
     """
-    # Match Swagger exactly by default:
-    headers = {
-        "accept": "application/json",
-        "Content-Type": "application/json",
-        "User-Agent": "python-requests/2.32.5",
-        "Authorization": JWT,  # <-- hard-coded token
-    }
-
     thread_id, session_id, device_id = _normalize_ids(row_ids)
 
     payload = {
@@ -273,159 +279,273 @@ def prepare_and_send(query_text: str, row_ids: Dict[str, str], retries: int = RE
         "content": [{"type": "text", "text": query_text}],
         "device_id": device_id,
     }
+    status, body, parsed_text, _ = await _send_payload(payload, retries)
+    return status, body, parsed_text
 
-    req = Request(
-        "POST",
-        f"{BASE_URL.rstrip('/')}/{ENDPOINT.lstrip('/')}",
-        headers=headers,
-        json=payload
-    )
-    prepared = client.session.prepare_request(req)
-
-    # redact Authorization for logs
-    safe_headers = dict(prepared.headers)
-    if "Authorization" in safe_headers:
-        try:
-            scheme, _ = safe_headers["Authorization"].split(" ", 1)
-            safe_headers["Authorization"] = f"{scheme} [REDACTED]"
-        except Exception:
-            safe_headers["Authorization"] = "[REDACTED]"
-
-    logger.info("PREPARED %s %s", prepared.method, prepared.url)
-    for k, v in safe_headers.items():
-        logger.debug("REQ-HEADER %s: %s", k, v)
-
-    body_preview = prepared.body
-    try:
-        if isinstance(body_preview, bytes):
-            body_preview = body_preview.decode("utf-8", errors="ignore")
-    except Exception:
-        body_preview = str(body_preview)
-    logger.debug("REQ-BODY: %s", body_preview)
+async def _send_payload(payload: Dict[str, Any], retries: int = RETRIES) -> Tuple[Any, Any, Any, Dict[str, str]]:
+    """
+    POST one payload (single- or multi-content) with retries/backoff.
+    Returns (status, body, parsed_text, ref_outputs); ref_outputs maps each
+    ref_id seen in a tool_runner step_update to its output, for the
+    multi-input BATCH_API path.
+    """
+    logger.info("POST %s", ENDPOINT)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("REQ-BODY: %s", payload)
 
     attempt = 0
-    attempt_timeout = float(client.timeout or BASE_TIMEOUT) if client.timeout else BASE_TIMEOUT
 
     while True:
         attempt += 1
+        sched = min(attempt - 1, RETRIES + 1)
+        attempt_timeout = _READ_TIMEOUTS[sched]
         try:
             t0 = time.time()
-            resp = client.session.send(prepared, timeout=attempt_timeout, stream=False)
+            async with client.stream("POST", ENDPOINT, json=payload, timeout=_ATTEMPT_TIMEOUTS[sched]) as resp:
+                ctype = (resp.headers.get("Content-Type") or "").lower()
+
+                if "text/event-stream" in ctype:
+                    # Parse the stream as it arrives: keep only the latest
+                    # tool_runner output plus a 2-slot tail for the fallback,
+                    # instead of buffering the whole body and re-parsing every
+                    # event afterwards (O(1) memory, 1-2 parses that matter).
+                    events = 0
+                    last_data = ""
+                    ref_outputs: Dict[str, str] = {}
+                    last_tool_output = None
+                    prev_obj = None
+                    last_obj = None
+                    # agent streams often re-emit identical lines (each event a
+                    # superset of the last); hashing the payload is far cheaper
+                    # than re-parsing it, so repeats are skipped outright
+                    seen_hashes: set = set()
+                    async for raw_line in resp.aiter_lines():
+                        s = raw_line.strip()
+                        if not s.startswith("data:"):
+                            continue
+                        events += 1
+                        json_part = s[5:].lstrip()
+                        last_data = json_part
+                        h = hash(json_part)
+                        if h in seen_hashes:
+                            continue
+                        seen_hashes.add(h)
+                        obj = _parse_sse_json(json_part)
+                        if obj is None or not isinstance(obj, dict):
+                            continue
+                        prev_obj, last_obj = last_obj, obj
+                        if obj.get("type") == "step_update":
+                            d = obj.get("data") or {}
+                            if d.get("step") == "tool_runner" and "output" in d:
+                                out = d["output"]
+                                last_tool_output = out if isinstance(out, str) else _dumps(out)
+                                if d.get("ref_id") is not None:
+                                    ref_outputs[str(d["ref_id"])] = last_tool_output
+
+                    elapsed = time.time() - t0
+                    logger.info("Attempt %d -> status=%s (%d SSE events) elapsed=%.2fs timeout=%.1fs",
+                                attempt, resp.status_code, events, elapsed, attempt_timeout)
+
+                    if last_tool_output is None and prev_obj is not None:
+                        # Fallback: second-last event's 'output'
+                        d = prev_obj.get("data") or {}
+                        out = d.get("output")
+                        if out is not None:
+                            last_tool_output = out if isinstance(out, str) else _dumps(out)
+
+                    return resp.status_code, last_data, (last_tool_output or ""), ref_outputs
+
+                raw = await resp.aread()
+
             elapsed = time.time() - t0
             logger.info("Attempt %d -> status=%s elapsed=%.2fs timeout=%.1fs",
                         attempt, resp.status_code, elapsed, attempt_timeout)
 
-            ctype = (resp.headers.get("Content-Type") or "").lower()
-            text_body = None
-            data_body = None
-
+            text_body = raw.decode("utf-8", "replace")
             # Try JSON first (Swagger returns JSON)
             try:
-                data_body = resp.json()
+                data_body = _loads(text_body)
             except Exception:
-                text_body = resp.text
-
-            # If server actually streamed SSE with application/event-stream
-            if "text/event-stream" in ctype:
-                body_text = text_body if text_body is not None else resp.text
-                return resp.status_code, body_text
+                data_body = None
 
-            # Otherwise return whichever we have
-            return resp.status_code, (data_body if data_body is not None else (text_body or ""))
+            # Return whichever we have; caller runs the dict-body extraction
+            return resp.status_code, (data_body if data_body is not None else text_body), None, {}
 
-        except req_exceptions.ReadTimeout as e:
+        except httpx.ReadTimeout as e:
             logger.warning("Attempt %d ReadTimeout after %.1fs: %s", attempt, attempt_timeout, str(e))
             if attempt > retries:
                 logger.error("Exceeded retries (%d) -> TIMEOUT", retries)
-                return "TIMEOUT", f"ReadTimeout after {attempt_timeout}s: {str(e)}"
-            backoff = min(0.5 * (2 ** (attempt - 1)), 8.0)
-            attempt_timeout = min(attempt_timeout * 1.75, MAX_TIMEOUT)
-            logger.info("Sleeping %.2fs then retrying (next timeout=%.1fs)", backoff, attempt_timeout)
-            time.sleep(backoff)
+                return "TIMEOUT", f"ReadTimeout after {attempt_timeout}s: {str(e)}", None, {}
+            backoff = _BACKOFF[sched]
+            logger.info("Sleeping %.2fs then retrying (next timeout=%.1fs)",
+                        backoff, _READ_TIMEOUTS[min(sched + 1, RETRIES + 1)])
+            await asyncio.sleep(backoff)
             continue
 
-        except req_exceptions.ConnectionError as e:
+        except (httpx.ConnectError, httpx.ConnectTimeout) as e:
             logger.warning("Attempt %d ConnectionError: %s", attempt, str(e))
             if attempt > retries:
                 logger.error("Exceeded retries (%d) -> REQUEST_ERROR", retries)
-                return "REQUEST_ERROR", str(e)
-            backoff = min(0.5 * (2 ** (attempt - 1)), 8.0)
+                return "REQUEST_ERROR", str(e), None, {}
+            backoff = _BACKOFF[sched]
             logger.info("Sleeping %.2fs then retrying connection", backoff)
-            time.sleep(backoff)
+            await asyncio.sleep(backoff)
             continue
 
         except Exception as e:
             logger.exception("Unexpected exception: %s", str(e))
-            return "REQUEST_ERROR", str(e)
+            return "REQUEST_ERROR", str(e), None, {}
 
 # ---------- Main flow (batched) ----------
-def main():
-    queries = load_queries(CSV_PATH)
-    total = len(queries)
-    logger.info("Loaded %d queries from %s", total, CSV_PATH)
+def _entry(q: Dict[str, str], status: Any, parsed_output: str, body_text: str) -> Dict[str, Any]:
+    now = datetime.now()
+    return {
+        "id": q.get("id", ""),
+        "query": q.get("query", ""),
+        "status": status,
+        "resp_text": parsed_output,
+        "body": body_text,
+        "timestamp": now.timestamp(),
+        "date": datetime.now(timezone.utc).isoformat(),
+        "date_human": now.strftime("%Y-%m-%d"),
+        "timestamp_human": now.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+async def run_group(sem: asyncio.Semaphore, group_key: Tuple[str, str, str],
+                    group: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+    """Send one multi-content request for a (thread, session, device) group and
+    fan the per-ref_id outputs back out to one entry per query."""
+    thread_id, session_id, device_id = group_key
+    payload = {
+        "thread_id": thread_id,
+        "session_id": session_id,
+        "content": [{"type": "text", "text": q["query"], "ref_id": q["id"]} for q in group],
+        "device_id": device_id,
+    }
 
+    async with sem:
+        logger.info("Running grouped request (%d queries, thread=%s session=%s)",
+                    len(group), thread_id, session_id)
+        status, body, parsed_text, ref_outputs = await _send_payload(payload, retries=RETRIES)
+
+    if parsed_text is not None:
+        body_text = body
+        default_output = parsed_text
+    else:
+        default_output = _extract_tool_runner_output_from_stream(body)
+        try:
+            body_text = body if isinstance(body, str) else _dumps(body)
+        except Exception:
+            body_text = str(body)
+
+    return [
+        _entry(q, status, ref_outputs.get(str(q["id"]), default_output), body_text)
+        for q in group
+    ]
+
+async def run_query(sem: asyncio.Semaphore, q: Dict[str, str]) -> Dict[str, Any]:
+    """Run one query under the batch semaphore and build its result entry."""
+    qid = q.get("id", "")
+    qtext = q.get("query", "")
+
+    row_ids = {
+        "thread_id": q.get("thread_id") or "",
+        "session_id": q.get("session_id") or "",
+        "device_id": q.get("device_id") or "",
+    }
+
+    async with sem:
+        logger.info("Running query id=%s: %s", qid, qtext[:120])
+        status, body, parsed_text = await prepare_and_send(qtext, row_ids=row_ids, retries=RETRIES)
+
+    if parsed_text is not None:
+        # SSE response: the stream was already parsed incrementally
+        parsed_output = parsed_text
+        body_text = body
+    else:
+        parsed_output = _extract_tool_runner_output_from_stream(body)
+        try:
+            body_text = body if isinstance(body, str) else _dumps(body)
+        except Exception:
+            body_text = str(body)
+
+    return _entry(q, status, parsed_output, body_text)
+
+async def main():
     start = max(0, START_INDEX)
-    if start >= total:
-        logger.error("START_INDEX (%d) >= total queries (%d). Nothing to do.", start, total)
-        return
+    logger.info("Streaming queries from %s (batch_size=%d, start index %d)", CSV_PATH, BATCH_SIZE, start)
 
-    results: List[Dict[str, Any]] = []
-    slice_to_process = queries[start:]
-    batches = list(chunked(slice_to_process, BATCH_SIZE))
-    logger.info("Processing %d batches (batch_size=%d) starting at index %d", len(batches), BATCH_SIZE, start)
+    # Queries stream straight off the CSV: islice fast-skips to START_INDEX and
+    # chunked pulls one batch at a time, so memory never holds the whole file.
+    batch_iter = chunked(itertools.islice(load_queries(CSV_PATH), start, None), BATCH_SIZE)
 
-    processed_count = start
-    for batch_idx, batch in enumerate(batches, start=0):
-        logger.info("Starting batch %d/%d (queries %d..%d)",
-                    batch_idx+1, len(batches), processed_count+1, processed_count+len(batch))
-
-        for q in batch:
-            qid = q.get("id", "")
-            qtext = q.get("query", "")
-            logger.info("Running query id=%s: %s", qid, qtext[:120])
-
-            row_ids = {
-                "thread_id": q.get("thread_id") or "",
-                "session_id": q.get("session_id") or "",
-                "device_id": q.get("device_id") or "",
-            }
+    results: List[Dict[str, Any]] = []
 
-            status, body = prepare_and_send(qtext, row_ids=row_ids, retries=RETRIES)
+    # All queries in a batch run concurrently; the semaphore caps in-flight
+    # requests at BATCH_SIZE so retries never overshoot the connection pool.
+    sem = asyncio.Semaphore(BATCH_SIZE)
 
-            # If SSE-like, parse for second-last tool_runner output
-            if isinstance(body, str) and body.strip().startswith("data:"):
-                parsed_output = _extract_tool_runner_output_from_stream(body)
-                body_text = body
+    # Reports stream row-by-row in append mode: rewriting the full accumulated
+    # list after every batch was O(batches x rows) serialization work and lost
+    # everything on a crash. The pretty-printed JSON is produced exactly once
+    # at the end; the incremental file is JSON Lines.
+    processed_count = start
+    with open(OUT_CSV, "w", newline="", encoding="utf-8") as csvfh, \
+         open(OUT_JSONL, "ab") as jsonl_fh:
+        writer = csv.writer(csvfh)
+        writer.writerow(CSV_FIELDNAMES)
+
+        def write_batch(entries: List[Dict[str, Any]]) -> None:
+            for entry in entries:
+                writer.writerow(csv_row(entry))
+                jsonl_fh.write(orjson.dumps(entry, option=orjson.OPT_NON_STR_KEYS, default=str) + b"\n")
+            csvfh.flush()
+            jsonl_fh.flush()
+
+        batch = next(batch_iter, None)
+        if batch is None:
+            logger.error("No queries to run (START_INDEX=%d skipped everything in %s).", start, CSV_PATH)
+        batch_idx = 0
+        # Report writes run in a worker thread so they overlap the BATCH_DELAY
+        # sleep and the next batch's network wait; awaiting the previous writer
+        # before launching the next keeps rows in batch order.
+        writer_task = None
+        while batch is not None:
+            logger.info("Starting batch %d (queries %d..%d)",
+                        batch_idx+1, processed_count+1, processed_count+len(batch))
+
+            if BATCH_API:
+                # One request per (thread, session, device) group; sorting
+                # first keeps same-thread queries adjacent for groupby
+                grouped = itertools.groupby(sorted(batch, key=_normalize_ids), key=_normalize_ids)
+                group_list = [(key, list(g)) for key, g in grouped]
+                nested = await asyncio.gather(*(run_group(sem, key, g) for key, g in group_list))
+                batch_results = [entry for entries in nested for entry in entries]
             else:
-                parsed_output = _extract_tool_runner_output_from_stream(body)
-                try:
-                    body_text = body if isinstance(body, str) else json.dumps(body, ensure_ascii=False, default=str)
-                except Exception:
-                    body_text = str(body)
+                batch_results = await asyncio.gather(*(run_query(sem, q) for q in batch))
+            results.extend(batch_results)
+            processed_count += len(batch)
 
-            entry = {
-                "id": qid,
-                "query": qtext,
-                "status": status,
-                "resp_text": parsed_output,
-                "body": body_text,
-                "timestamp": time.time(),
-                "date": datetime.now(timezone.utc).isoformat(),
-            }
-            results.append(entry)
-            processed_count += 1
+            if writer_task is not None:
+                await writer_task
+            writer_task = asyncio.create_task(asyncio.to_thread(write_batch, batch_results))
+
+            batch = next(batch_iter, None)
+            if batch is not None:
+                logger.info("Batch %d complete. Sleeping %.1fs before next batch...", batch_idx+1, BATCH_DELAY)
+                await asyncio.sleep(BATCH_DELAY)
+            batch_idx += 1
 
-            time.sleep(0.1)
+        if writer_task is not None:
+            await writer_task
 
-        write_json(results, OUT_JSON)
-        write_csv(results, OUT_CSV)
+    await client.aclose()
 
-        if batch_idx < len(batches) - 1:
-            logger.info("Batch %d complete. Sleeping %.1fs before next batch...", batch_idx+1, BATCH_DELAY)
-            time.sleep(BATCH_DELAY)
+    write_json(results, OUT_JSON)
 
     logger.info("All batches processed. Total results: %d", len(results))
     logger.info("Final JSON: %s", OUT_JSON)
+    logger.info("Final JSONL: %s", OUT_JSONL)
     logger.info("Final CSV: %s", OUT_CSV)
 
     try:
@@ -438,4 +558,4 @@ def main():
         logger.exception("Combining CSV reports failed.")
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
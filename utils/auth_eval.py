@@ -0,0 +1,61 @@
+# utils/auth_eval.py - per-row status/expectation helpers for the auth runner
+#
+# Strictly annotated and dependency-free on purpose: the per-row evaluation
+# is the runner's hottest pure-Python code, and keeping it in its own typed
+# module means a mypyc/Cython build step could compile it unchanged whenever
+# one lands in this repo.
+from typing import Any, List
+
+
+def normalize_status(status: Any, body: Any) -> int:
+    """Map sentinel string statuses (request errors) to -1 for matching."""
+    if isinstance(status, int):
+        return status
+    return -1
+
+
+def status_matches(status: int, expr: str) -> bool:
+    """True if status satisfies expr: exact code, '4xx' range, '|' alternatives,
+    or empty/'any' which matches everything."""
+    expr = (expr or "").strip().lower()
+    if not expr or expr == "any":
+        return True
+    for part in expr.split("|"):
+        part = part.strip()
+        if len(part) == 3 and part.endswith("xx"):
+            try:
+                lo = int(part[0]) * 100
+            except ValueError:
+                continue
+            if lo <= status < lo + 100:
+                return True
+        else:
+            try:
+                if status == int(part):
+                    return True
+            except ValueError:
+                continue
+    return False
+
+
+def expected_for_substep(expect_status_raw: str, substep: str) -> str:
+    """For chained flows 'A|B' means: A applies to validate, B to login; a
+    single value applies to both substeps."""
+    parts: List[str] = [p.strip() for p in (expect_status_raw or "").split("|")
+                        if p.strip()]
+    if len(parts) >= 2:
+        return parts[0] if substep == "validate" else parts[1]
+    return parts[0] if parts else ""
+
+
+def body_contains(body: Any, needle_lc: str) -> bool:
+    """True if any string leaf of body contains needle_lc (already lowered).
+    Walks the parsed structure and short-circuits on the first hit instead
+    of serializing the whole body just to scan it."""
+    if isinstance(body, str):
+        return needle_lc in body.lower()
+    if isinstance(body, dict):
+        return any(body_contains(v, needle_lc) for v in body.values())
+    if isinstance(body, (list, tuple)):
+        return any(body_contains(v, needle_lc) for v in body)
+    return False
@@ -1,9 +1,9 @@
-# utils/payload_loader.py - simple CSV loader that yields parsed_request JSON
+# utils/payload_loader.py - streaming CSV loader that yields parsed_request JSON
 import csv
-import json
-import os
 import logging
 
+import orjson
+
 def get_logger(name: str = "api-tests"):
     logger = logging.getLogger(name)
     if not logger.handlers:
@@ -14,22 +14,32 @@ def get_logger(name: str = "api-tests"):
         logger.setLevel(logging.INFO)
     return logger
 
-def load_payload_from_csv(csv_path):
-    rows = []
+def iter_payloads(csv_path):
+    """Yield one entry per TSV row as it is read - O(1) memory in row count.
+
+    The Sample_Request column name is resolved once from the header instead
+    of probing three keys per row, and JSON cells parse through orjson.
+    """
     with open(csv_path, newline='', encoding='utf-8') as fh:
         reader = csv.DictReader(fh, delimiter='\t')
+        fieldnames = reader.fieldnames or []
+        sample_key = next((c for c in ('Sample_Request', 'SampleRequest', 'Sample')
+                           if c in fieldnames), None)
+        id_key = next((c for c in ('ID', 'TestCaseID') if c in fieldnames), None)
         for r in reader:
-            # Attempt to parse Sample_Request column as JSON if present
-            sample = r.get('Sample_Request') or r.get('SampleRequest') or r.get('Sample')
+            sample = r.get(sample_key) if sample_key else None
             parsed = None
             if sample:
                 try:
-                    parsed = json.loads(sample)
-                except Exception:
+                    parsed = orjson.loads(sample)
+                except orjson.JSONDecodeError:
                     parsed = None
-            rows.append({
-                'TestCaseID': r.get('ID') or r.get('TestCaseID') or '',
+            yield {
+                'TestCaseID': (r.get(id_key) or '') if id_key else '',
                 'row': r,
                 'parsed_request': parsed
-            })
-    return rows
+            }
+
+def load_payload_from_csv(csv_path):
+    """Materialized form of iter_payloads, kept for existing callers."""
+    return list(iter_payloads(csv_path))
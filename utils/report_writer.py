@@ -0,0 +1,70 @@
+# utils/report_writer.py - background batched writer for streamed report files
+import os
+import queue
+import threading
+
+# Flush once this many bytes are pending, so the kernel sees few large writes
+# instead of one small write per row.
+FLUSH_BYTES = 64 * 1024
+
+# writev takes at most IOV_MAX buffers per call
+_IOV_MAX = 1024
+
+_CLOSE = object()
+
+
+class BackgroundWriter:
+    """Appends bytes to a file from a background thread.
+
+    The request loop calls submit() and returns immediately; a worker thread
+    drains the queue and coalesces pending buffers into large writes, so disk
+    latency never blocks the event loop or thread pool issuing requests.
+    """
+
+    def __init__(self, path):
+        self._fd = os.open(str(path), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._drain, daemon=True)
+        self._thread.start()
+
+    def submit(self, data: bytes):
+        """Queue one buffer for writing; never blocks on disk."""
+        self._queue.put(data)
+
+    def _drain(self):
+        pending = []
+        pending_bytes = 0
+        while True:
+            item = self._queue.get()
+            if item is _CLOSE:
+                break
+            pending.append(item)
+            pending_bytes += len(item)
+            # opportunistically batch whatever else is already queued
+            while pending_bytes < FLUSH_BYTES:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _CLOSE:
+                    self._flush(pending)
+                    return
+                pending.append(item)
+                pending_bytes += len(item)
+            if pending_bytes >= FLUSH_BYTES or self._queue.empty():
+                self._flush(pending)
+                pending = []
+                pending_bytes = 0
+        self._flush(pending)
+
+    def _flush(self, pending):
+        # os.writev hands the kernel the buffer list as-is: one syscall per
+        # batch and no b"".join copy of the pending rows
+        for i in range(0, len(pending), _IOV_MAX):
+            os.writev(self._fd, pending[i:i + _IOV_MAX])
+
+    def close(self):
+        """Flush everything queued so far and release the file descriptor."""
+        self._queue.put(_CLOSE)
+        self._thread.join()
+        os.close(self._fd)